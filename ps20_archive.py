@@ -0,0 +1,202 @@
+"""
+Columnar archive sink for raw PS20 register data (Parquet or Arrow IPC)
+
+Frames are buffered in memory and written by a background thread to
+time-partitioned files, one column per register. Buffered rows are
+flushed every few minutes (or sooner once the batch size is reached), so
+the current day's partition holds one small file per flush:
+
+    <archive_dir>/date=YYYY-MM-DD/ps20-<first frame time>.parquet
+
+Once a day has passed (checked at startup and after each flush), its
+files are compacted into a single file sorted by time, with row groups
+of the batch size:
+
+    <archive_dir>/date=YYYY-MM-DD/ps20-YYYYMMDD.parquet
+
+The date=... directories are Hive-style partitions, so analysis jobs can
+open the whole archive with pyarrow.dataset.dataset(archive_dir,
+partitioning="hive") and filter on date, time, unit_number or any register.
+"""
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+# Registers stored per frame (matches the 125-register read in the collector)
+ARCHIVE_REGISTERS = 125
+
+# Default buffering: rows per flush (and per row group in daily files) and
+# maximum age of buffered rows in seconds
+ARCHIVE_BATCH_ROWS = 50000
+ARCHIVE_FLUSH_INTERVAL = 300
+
+# Cycles that may wait for the writer thread before new ones are dropped
+ARCHIVE_QUEUE_SIZE = 1000
+
+ARCHIVE_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+ARCHIVE_SCHEMA = pa.schema(
+    [("time", pa.timestamp("ns", tz="UTC")), ("unit_number", pa.uint8())]
+    + [(f"reg_{i}", pa.uint16()) for i in range(1, ARCHIVE_REGISTERS + 1)]
+)
+
+
+class ArchiveSink:
+    """Buffer raw register frames in columnar batches and write them off the polling thread"""
+
+    def __init__(self, archive_dir, archive_format="parquet",
+                 batch_rows=ARCHIVE_BATCH_ROWS, flush_interval=ARCHIVE_FLUSH_INTERVAL):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format: {archive_format}")
+        self.archive_dir = archive_dir
+        self.archive_format = archive_format
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.dropped_cycles = 0
+        self.compacted_before = None
+        self.queue = queue.Queue(maxsize=ARCHIVE_QUEUE_SIZE)
+        os.makedirs(archive_dir, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name="ps20-archive", daemon=True)
+        self.thread.start()
+
+    def add_cycle(self, cycle_time, unit_registers):
+        """Queue one polling cycle: cycle_time in Unix seconds, list of (unit_number, registers dict)"""
+        if not unit_registers:
+            return
+        try:
+            self.queue.put_nowait((int(cycle_time * 1e9), unit_registers))
+        except queue.Full:
+            # Never block the collector on a slow disk
+            self.dropped_cycles += 1
+            print(f"WARNING: Archive writer falling behind, dropped cycle ({self.dropped_cycles} total)")
+
+    def close(self):
+        """Flush buffered rows and stop the writer thread"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def _new_columns(self):
+        return {name: [] for name in ARCHIVE_SCHEMA.names}
+
+    def _run(self):
+        self._compact_past_days()
+        columns = self._new_columns()
+        rows = 0
+        oldest = None
+        while True:
+            timeout = None if oldest is None else max(0, oldest + self.flush_interval - time.time())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                break
+
+            if item:
+                time_ns, unit_registers = item
+                for unit_number, registers in unit_registers:
+                    columns["time"].append(time_ns)
+                    columns["unit_number"].append(unit_number)
+                    for i in range(1, ARCHIVE_REGISTERS + 1):
+                        columns[f"reg_{i}"].append(registers.get(i))
+                    rows += 1
+                if oldest is None:
+                    oldest = time.time()
+
+            if rows and (rows >= self.batch_rows or time.time() - oldest >= self.flush_interval):
+                self._flush(columns)
+                self._compact_past_days()
+                columns = self._new_columns()
+                rows = 0
+                oldest = None
+
+        if rows:
+            self._flush(columns)
+
+    def _flush(self, columns):
+        """Write buffered rows, one file per UTC date partition"""
+        try:
+            table = pa.Table.from_pydict(columns, schema=ARCHIVE_SCHEMA)
+            dates = [datetime.fromtimestamp(t / 1e9, timezone.utc).strftime('%Y-%m-%d')
+                     for t in columns["time"]]
+            for date in sorted(set(dates)):
+                mask = pa.array([d == date for d in dates])
+                self._write_file(date, table.filter(mask))
+        except Exception as e:
+            print(f"ERROR writing archive batch: {e}")
+
+    def _write_file(self, date, table):
+        partition_dir = os.path.join(self.archive_dir, f"date={date}")
+        os.makedirs(partition_dir, exist_ok=True)
+        first = datetime.fromtimestamp(table["time"][0].value / 1e9, timezone.utc)
+        base = os.path.join(partition_dir, f"ps20-{first.strftime('%Y%m%dT%H%M%S')}")
+        extension = ARCHIVE_FORMATS[self.archive_format]
+        path = base + extension
+        suffix = 1
+        while os.path.exists(path):
+            path = f"{base}-{suffix}{extension}"
+            suffix += 1
+
+        self._write_table(table, path)
+        print(f"Archived {table.num_rows} rows to {path}")
+
+    def _write_table(self, table, path):
+        # Write under a temporary name so readers never see a partial file
+        tmp_path = path + ".tmp"
+        if self.archive_format == "parquet":
+            pq.write_table(table, tmp_path, compression="zstd", row_group_size=self.batch_rows)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression="zstd")
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                    writer.write_table(table, max_chunksize=self.batch_rows)
+        os.replace(tmp_path, path)
+
+    def _read_table(self, path):
+        if self.archive_format == "parquet":
+            return pq.read_table(path, schema=ARCHIVE_SCHEMA)
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def _compact_past_days(self):
+        """Merge the flush files of every partition before today (UTC) into one daily file"""
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        if today == self.compacted_before:
+            return
+        try:
+            for name in sorted(os.listdir(self.archive_dir)):
+                if name.startswith("date=") and name[5:] < today:
+                    self._compact_partition(name[5:])
+            self.compacted_before = today
+        except Exception as e:
+            print(f"ERROR compacting archive: {e}")
+
+    def _compact_partition(self, date):
+        partition_dir = os.path.join(self.archive_dir, f"date={date}")
+        extension = ARCHIVE_FORMATS[self.archive_format]
+        daily_name = f"ps20-{date.replace('-', '')}{extension}"
+        names = sorted(name for name in os.listdir(partition_dir) if name.endswith(extension))
+        if not names or names == [daily_name]:
+            return
+
+        # The daily file is included so a compaction interrupted after the rename is repaired
+        table = pa.concat_tables([self._read_table(os.path.join(partition_dir, name)) for name in names])
+        table = table.sort_by([("time", "ascending"), ("unit_number", "ascending")])
+        if table.num_rows > 1:
+            times = table["time"].cast(pa.int64())
+            units = table["unit_number"]
+            changed = pc.or_(pc.not_equal(times[1:], times[:-1]), pc.not_equal(units[1:], units[:-1]))
+            table = table.filter(pa.concat_arrays([pa.array([True])] + changed.chunks))
+
+        self._write_table(table, os.path.join(partition_dir, daily_name))
+        for name in names:
+            if name != daily_name:
+                os.remove(os.path.join(partition_dir, name))
+        print(f"Compacted {len(names)} files ({table.num_rows} rows) into {daily_name}")
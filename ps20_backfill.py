@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Backfill the InfluxDB ps20 measurement from archived raw register files
+
+Replays Parquet/Arrow files written by the collector's --archive-dir sink
+through the same decode path as live collection (build_data_point), so
+re-running after a schema change rewrites history in the new shape.
+Points keep their original cycle time, the same time the collector
+stamps on live points, so re-writing a file is idempotent: InfluxDB
+overwrites points with the same tags and time. Use --start/--end to
+limit a replay to an outage window.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc
+import pyarrow.parquet as pq
+from influxdb import InfluxDBClient
+from ps20_archive import ARCHIVE_FORMATS
+from ps20_collector import INFLUX_HOST, INFLUX_PORT, INFLUX_DB, build_data_point
+
+# Points sent per InfluxDB write request
+WRITE_BATCH_SIZE = 20000
+
+# Archive rows decoded at a time (bounds memory per worker)
+READ_BATCH_ROWS = 50000
+
+CHECKPOINT_FILE = "ps20_backfill_checkpoint.jsonl"
+
+
+def find_archive_files(paths):
+    """Expand files and directories into a sorted list of archive files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names
+                             if os.path.splitext(name)[1] in ARCHIVE_FORMATS.values())
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {path}")
+    return sorted(os.path.abspath(f) for f in files)
+
+
+def parse_time(value):
+    """Parse an ISO 8601 date/time (local time unless an offset is given) into Unix nanoseconds"""
+    try:
+        return int(datetime.fromisoformat(value).timestamp() * 1e9)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date/time: {value}")
+
+
+def file_signature(path, start_ns=None, end_ns=None):
+    """Identify a file version and time window so changed files or windows are replayed again"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{start_ns or ''}:{end_ns or ''}"
+
+
+def load_checkpoint(checkpoint_file):
+    """Load completed files as {path: signature} from the append-only checkpoint"""
+    completed = {}
+    if not os.path.exists(checkpoint_file):
+        return completed
+    with open(checkpoint_file) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Line cut short by an interrupted run; that file is replayed again
+                continue
+            completed[entry["path"]] = entry["signature"]
+    return completed
+
+
+def append_checkpoint(checkpoint_file, entries):
+    """Record completed files as one JSON line each, so checkpointing cost does not grow with the run"""
+    with open(checkpoint_file, 'a+') as f:
+        # Terminate a line cut short by an interrupted run so it does not swallow the next entry
+        if f.tell() > 0:
+            f.seek(f.tell() - 1)
+            if f.read(1) != "\n":
+                f.write("\n")
+        for path, signature in entries:
+            f.write(json.dumps({"path": path, "signature": signature}) + "\n")
+
+
+def iter_record_batches(path):
+    """Stream record batches from a Parquet or Arrow IPC archive file"""
+    if path.endswith(ARCHIVE_FORMATS["arrow"]):
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+    else:
+        yield from pq.ParquetFile(path).iter_batches(batch_size=READ_BATCH_ROWS)
+
+
+def read_cycle_sizes(path):
+    """Count rows per cycle time, used to restore the units_reporting field"""
+    if path.endswith(ARCHIVE_FORMATS["arrow"]):
+        with pa.memory_map(path) as source:
+            times = pa.ipc.open_file(source).read_all().column("time").cast(pa.int64())
+            counts = pc.value_counts(times)
+    else:
+        times = pq.read_table(path, columns=["time"]).column("time").cast(pa.int64())
+        counts = pc.value_counts(times)
+    return dict(zip(counts.field("values").to_pylist(), counts.field("counts").to_pylist()))
+
+
+def ignore_sigint():
+    """Worker initializer: leave Ctrl+C handling to the parent process"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def group_by_directory(paths):
+    """Group files by directory (one date partition per group), keeping the input order"""
+    groups = {}
+    for path in paths:
+        groups.setdefault(os.path.dirname(path), []).append(path)
+    return list(groups.values())
+
+
+def backfill_files(paths, database, batch_size, dry_run, start_ns=None, end_ns=None):
+    """Decode archive files and write rows in [start_ns, end_ns) to InfluxDB, returning (points written, rows skipped)
+
+    One client and one point buffer are shared across the files, so small
+    flush files still produce full-sized writes.
+    """
+    influx_client = None
+    if not dry_run:
+        influx_client = InfluxDBClient(host=INFLUX_HOST, port=INFLUX_PORT, database=database, gzip=True)
+
+    written = 0
+    skipped = 0
+    points = []
+    try:
+        for path in paths:
+            cycle_sizes = read_cycle_sizes(path)
+            for batch in iter_record_batches(path):
+                columns = {name: batch.column(name).to_pylist() for name in batch.schema.names if name != "time"}
+                times = batch.column("time").cast(pa.int64()).to_pylist()
+                reg_columns = [(int(name[4:]), columns[name]) for name in columns if name.startswith("reg_")]
+
+                for row in range(batch.num_rows):
+                    if (start_ns is not None and times[row] < start_ns) or (end_ns is not None and times[row] >= end_ns):
+                        continue
+                    registers = {i: values[row] for i, values in reg_columns if values[row] is not None}
+                    try:
+                        data_point = build_data_point(columns["unit_number"][row], registers)
+                    except KeyError:
+                        # Frame too short to decode
+                        skipped += 1
+                        continue
+                    data_point["time"] = times[row]
+                    data_point["fields"]["units_reporting"] = cycle_sizes[times[row]]
+                    points.append(data_point)
+
+                    if len(points) >= batch_size:
+                        if influx_client:
+                            influx_client.write_points(points, batch_size=batch_size)
+                        written += len(points)
+                        points = []
+
+        if points:
+            if influx_client:
+                influx_client.write_points(points, batch_size=batch_size)
+            written += len(points)
+    finally:
+        if influx_client:
+            influx_client.close()
+
+    return written, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Backfill Savant PS20 data into InfluxDB from archive files',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('paths', nargs='+',
+                        help='Archive files or directories (searched recursively for .parquet/.arrow)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Directories (date partitions) replayed in parallel (default: CPU count)')
+    parser.add_argument('-b', '--batch', type=int, default=WRITE_BATCH_SIZE,
+                        help=f'Points per InfluxDB write (default: {WRITE_BATCH_SIZE})')
+    parser.add_argument('-d', '--database', type=str, default=INFLUX_DB,
+                        help=f'InfluxDB database (default: {INFLUX_DB})')
+    parser.add_argument('-c', '--checkpoint', type=str, default=CHECKPOINT_FILE,
+                        help=f'Checkpoint file for resuming (default: {CHECKPOINT_FILE})')
+    parser.add_argument('-n', '--dry-run', action='store_true',
+                        help='Decode files without writing to InfluxDB or the checkpoint')
+    parser.add_argument('-s', '--start', type=parse_time, default=None,
+                        help='Only replay frames at or after this time (ISO 8601, e.g. 2026-10-01T14:00)')
+    parser.add_argument('-e', '--end', type=parse_time, default=None,
+                        help='Only replay frames before this time (ISO 8601)')
+
+    args = parser.parse_args()
+
+    try:
+        files = find_archive_files(args.paths)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    completed = load_checkpoint(args.checkpoint)
+    pending = [f for f in files if completed.get(f) != file_signature(f, args.start, args.end)]
+
+    print(f"PS20 Backfill")
+    print(f"=============")
+    print(f"InfluxDB: {INFLUX_HOST}:{INFLUX_PORT}")
+    print(f"Database: {args.database}")
+    if args.start is not None or args.end is not None:
+        window_start = datetime.fromtimestamp(args.start / 1e9) if args.start is not None else "beginning"
+        window_end = datetime.fromtimestamp(args.end / 1e9) if args.end is not None else "end"
+        print(f"Window: {window_start} to {window_end}")
+    print(f"Files: {len(pending)} to replay, {len(files) - len(pending)} already done")
+    print(f"Jobs: {args.jobs}")
+    print()
+
+    if not pending:
+        print("Nothing to do.")
+        return
+
+    groups = group_by_directory(pending)
+
+    start = time.time()
+    total_points = 0
+    total_skipped = 0
+    failed = 0
+    executor = ProcessPoolExecutor(max_workers=args.jobs, initializer=ignore_sigint)
+    try:
+        # Keep only one directory per worker in flight so Ctrl+C has nothing queued to drain
+        queued = iter(groups)
+        futures = {}
+        done = 0
+        while True:
+            for group in queued:
+                future = executor.submit(backfill_files, group, args.database, args.batch, args.dry_run,
+                                         args.start, args.end)
+                futures[future] = group
+                if len(futures) >= args.jobs:
+                    break
+            if not futures:
+                break
+
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                group = futures.pop(future)
+                directory = os.path.dirname(group[0])
+                done += 1
+                try:
+                    written, skipped = future.result()
+                except Exception as e:
+                    failed += len(group)
+                    print(f"[{done}/{len(groups)}] {directory}: ERROR - {e}")
+                    continue
+
+                total_points += written
+                total_skipped += skipped
+                if not args.dry_run:
+                    append_checkpoint(args.checkpoint,
+                                      [(path, file_signature(path, args.start, args.end)) for path in group])
+
+                elapsed = time.time() - start
+                rate = total_points / elapsed * 60 if elapsed > 0 else 0
+                print(f"[{done}/{len(groups)}] {directory}: {len(group)} files, {written} points"
+                      f"{f', {skipped} skipped' if skipped else ''} ({rate:,.0f} points/min)")
+
+    except KeyboardInterrupt:
+        # Files already being replayed run to completion; nothing else is started
+        executor.shutdown(wait=False, cancel_futures=True)
+        print("\n\nBackfill stopped by user. Re-run to resume from the checkpoint.")
+        sys.exit(1)
+
+    executor.shutdown()
+
+    elapsed = time.time() - start
+    print(f"\nWrote {total_points} points in {elapsed:.1f} seconds ({total_skipped} rows skipped)")
+    if failed:
+        print(f"{failed} files failed - re-run to retry them")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
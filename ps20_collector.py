@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import sys
 import time
+import signal
 import argparse
 from datetime import datetime
 from pymodbus.client import ModbusTcpClient
@@ -64,8 +65,59 @@ def to_signed(value):
     return value if value < 32768 else value - 65536
 
 
-def collect_unit_data(unit_number, unit_ip):
-    """Collect data from a single PS20 unit and return data point (does not write)"""
+def build_data_point(unit_number, registers):
+    """Decode registers (1-indexed dict) into an InfluxDB data point without time or units_reporting"""
+    # Decode stable identifiers
+    serial_number = decode_serial_number(registers)
+    ip_address = decode_ip_address(registers)
+    device_code = decode_device_code(registers)
+    timestamp = decode_timestamp(registers)
+
+    # Build tags
+    tags = {
+        "unit_number": str(unit_number),
+        "serial_number": serial_number,
+        "serial_suffix": serial_number[-3:],  # Last 3 digits for Grafana labels
+        "ip_address": ip_address
+    }
+
+    # Build fields
+    fields = {
+        "device_code": device_code,
+        "timestamp": timestamp
+    }
+
+    # Add registers 1-17 (signed and unsigned)
+    for i in range(1, 18):
+        unsigned_val = registers[i]
+        signed_val = to_signed(unsigned_val)
+        fields[f"reg_{i}"] = signed_val
+        fields[f"reg_{i}_unsigned"] = unsigned_val
+
+    # Add register 40 (signed and unsigned)
+    unsigned_val = registers[40]
+    signed_val = to_signed(unsigned_val)
+    fields["reg_40"] = signed_val
+    fields["reg_40_unsigned"] = unsigned_val
+
+    # Return data point for batch writing
+    return {
+        "measurement": INFLUX_MEASUREMENT,
+        "tags": tags,
+        "fields": fields
+    }
+
+
+def handle_sigterm(signum, frame):
+    """Treat SIGTERM (e.g. systemd stop) like Ctrl+C so buffered data is flushed"""
+    raise KeyboardInterrupt
+
+
+def collect_unit_data(unit_number, unit_ip, archive_rows=None):
+    """Collect data from a single PS20 unit and return data point (does not write)
+
+    If archive_rows is a list, the raw registers are appended to it as (unit_number, registers).
+    """
     try:
         # Connect to PS20 unit
         client = ModbusTcpClient(unit_ip, port=502, retries=1, timeout=5)
@@ -83,48 +135,13 @@ def collect_unit_data(unit_number, unit_ip):
 
         # Convert to dictionary with 1-indexed keys
         registers = {i: val for i, val in enumerate(rr.registers, start=1)}
+        data_point = build_data_point(unit_number, registers)
 
-        # Decode stable identifiers
-        serial_number = decode_serial_number(registers)
-        ip_address = decode_ip_address(registers)
-        device_code = decode_device_code(registers)
-        timestamp = decode_timestamp(registers)
-
-        # Build tags
-        tags = {
-            "unit_number": str(unit_number),
-            "serial_number": serial_number,
-            "serial_suffix": serial_number[-3:],  # Last 3 digits for Grafana labels
-            "ip_address": ip_address
-        }
-
-        # Build fields
-        fields = {
-            "device_code": device_code,
-            "timestamp": timestamp
-        }
-
-        # Add registers 1-17 (signed and unsigned)
-        for i in range(1, 18):
-            unsigned_val = registers[i]
-            signed_val = to_signed(unsigned_val)
-            fields[f"reg_{i}"] = signed_val
-            fields[f"reg_{i}_unsigned"] = unsigned_val
-
-        # Add register 40 (signed and unsigned)
-        unsigned_val = registers[40]
-        signed_val = to_signed(unsigned_val)
-        fields["reg_40"] = signed_val
-        fields["reg_40_unsigned"] = unsigned_val
-
-        # Return data point for batch writing
-        data_point = {
-            "measurement": INFLUX_MEASUREMENT,
-            "tags": tags,
-            "fields": fields
-        }
+        # Archive only frames that decode, so replayed units_reporting matches the live count
+        if archive_rows is not None:
+            archive_rows.append((unit_number, registers))
 
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Unit {unit_number} ({unit_ip}): OK - {serial_number}")
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Unit {unit_number} ({unit_ip}): OK - {data_point['tags']['serial_number']}")
         return data_point
 
     except Exception as e:
@@ -139,6 +156,14 @@ def main():
     )
     parser.add_argument('-i', '--interval', type=int, default=POLL_INTERVAL,
                         help=f'Polling interval in seconds (default: {POLL_INTERVAL})')
+    parser.add_argument('-a', '--archive-dir', type=str, default=None,
+                        help='Also archive raw registers as columnar files in this directory (requires pyarrow)')
+    parser.add_argument('--archive-format', choices=['parquet', 'arrow'], default='parquet',
+                        help='Archive file format (default: parquet)')
+    parser.add_argument('--archive-batch', type=int, default=None,
+                        help='Archive rows per flush and per row group in daily files (default: 50000)')
+    parser.add_argument('--archive-flush', type=int, default=None,
+                        help='Maximum seconds archive rows are buffered before writing (default: 300)')
 
     args = parser.parse_args()
     poll_interval = args.interval
@@ -150,6 +175,8 @@ def main():
     print(f"Measurement: {INFLUX_MEASUREMENT}")
     print(f"Polling interval: {poll_interval} seconds")
     print(f"Units: {len(UNIT_IPS)}")
+    if args.archive_dir:
+        print(f"Archive: {args.archive_dir} ({args.archive_format})")
     print()
 
     # Connect to InfluxDB
@@ -162,6 +189,20 @@ def main():
         print(f"Failed to connect to InfluxDB: {e}")
         sys.exit(1)
 
+    # Start archive sink (optional - pyarrow is only needed when archiving)
+    archive = None
+    if args.archive_dir:
+        try:
+            from ps20_archive import ArchiveSink, ARCHIVE_BATCH_ROWS, ARCHIVE_FLUSH_INTERVAL
+        except ImportError as e:
+            print(f"Archiving requires pyarrow: {e}")
+            sys.exit(1)
+        archive = ArchiveSink(args.archive_dir, args.archive_format,
+                              batch_rows=args.archive_batch or ARCHIVE_BATCH_ROWS,
+                              flush_interval=args.archive_flush or ARCHIVE_FLUSH_INTERVAL)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
     print("\nStarting data collection (Ctrl+C to stop)...\n")
 
     iteration = 0
@@ -173,16 +214,18 @@ def main():
 
             # Collect from all units
             all_data_points = []
+            archive_rows = [] if archive else None
             for unit_number in sorted(UNIT_IPS.keys()):
                 unit_ip = UNIT_IPS[unit_number]
-                data_point = collect_unit_data(unit_number, unit_ip)
+                data_point = collect_unit_data(unit_number, unit_ip, archive_rows)
                 if data_point:
                     all_data_points.append(data_point)
 
-            # Add units_reporting field to each data point
+            # Add units_reporting field and the cycle time (shared with the archive) to each data point
             units_reporting = len(all_data_points)
             for data_point in all_data_points:
                 data_point["fields"]["units_reporting"] = units_reporting
+                data_point["time"] = int(cycle_start * 1e9)
 
             # Write all data points with same timestamp in batch
             if all_data_points:
@@ -192,6 +235,10 @@ def main():
                 except Exception as e:
                     print(f"ERROR writing batch to InfluxDB: {e}")
 
+            # Hand raw frames to the archive writer thread (never blocks)
+            if archive:
+                archive.add_cycle(cycle_start, archive_rows)
+
             print()
 
             # Wait for next cycle
@@ -203,6 +250,12 @@ def main():
     except KeyboardInterrupt:
         print("\n\nData collection stopped by user.")
 
+    finally:
+        # Flush on any exit path so buffered raw data is not lost
+        if archive:
+            print("Flushing archive...")
+            archive.close()
+
     print("Exiting...")
 
 
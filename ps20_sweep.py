@@ -0,0 +1,156 @@
+"""
+Register-space sweeper for Savant PS20 Modbus units
+
+Maps which register ranges a unit implements. Each 125-register block is
+probed and failing blocks are bisected down to the resolution; blocks that
+still fail are treated as empty. Once any read succeeds, the edges of that
+range are binary-searched down to single registers, so every reported range
+is exact regardless of block alignment.
+"""
+import time
+from pymodbus.exceptions import ModbusException
+from pymodbus.pdu import ExceptionResponse
+
+SWEEP_BLOCK_SIZE = 125      # Largest register count allowed in one Modbus read
+SWEEP_RESOLUTION = 16       # Failing blocks this size or smaller are not split further
+SWEEP_RATE = 20.0           # Maximum requests per second sent to the unit
+ADDRESS_SPACE = 65536       # Modbus register addresses 0-65535
+
+# Modbus exception code meaning the function itself is not implemented
+ILLEGAL_FUNCTION = 0x01
+
+# probe() result when the unit does not answer at all
+PROBE_TIMEOUT = -1
+
+
+class SweepAborted(Exception):
+    """Raised when a sweep cannot continue (e.g. connection lost)"""
+
+
+class FunctionUnsupported(Exception):
+    """Raised when the unit rejects the read function itself"""
+
+
+class RegisterSweeper:
+    """Map implemented register ranges, keeping partial results if the sweep is interrupted"""
+
+    def __init__(self, client, rate=SWEEP_RATE, resolution=SWEEP_RESOLUTION):
+        self.client = client
+        self.min_interval = 1.0 / rate
+        self.resolution = resolution
+        self.last_request = 0.0
+        self.requests = 0
+        self.timeouts = 0
+        self.ranges = {}      # table -> list of (start, end), None if the function is unsupported
+        self.swept_to = {}    # table -> first address not yet swept
+
+    def probe(self, read_func, address, count):
+        """Read a block, returning the number of registers answered (0 if rejected, PROBE_TIMEOUT if silent)"""
+        # Only one request is ever outstanding; space them out to cap the rate
+        wait = self.last_request + self.min_interval - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        self.last_request = time.time()
+        self.requests += 1
+
+        try:
+            rr = read_func(address=address, count=count, device_id=1)
+        except ModbusException:
+            # No response - some firmware stays silent instead of raising an exception
+            self.timeouts += 1
+            if not self.client.connected and not self.client.connect():
+                raise SweepAborted(f"connection lost at address {address}")
+            return PROBE_TIMEOUT
+
+        if not rr.isError():
+            # The PS20 answers long reads with fewer registers than requested
+            return min(len(rr.registers), count)
+        if isinstance(rr, ExceptionResponse) and rr.exception_code == ILLEGAL_FUNCTION:
+            raise FunctionUnsupported()
+        return 0
+
+    def reads_fully(self, read_func, address, count):
+        """Return True if all count registers from address can be read"""
+        return self.probe(read_func, address, count) == count
+
+    def longest_read(self, read_func, address, limit, backwards=False):
+        """Binary-search the longest fully readable run (at most limit) starting at, or ending before, address"""
+        low, high = 0, limit
+        while low < high:
+            mid = (low + high + 1) // 2
+            start = address - mid if backwards else address
+            if self.reads_fully(read_func, start, mid):
+                low = mid
+            else:
+                high = mid - 1
+        return low
+
+    def find_first(self, read_func, address, count):
+        """Bisect a failing block down to the resolution, returning (address, answered) of the first hit or None"""
+        result = self.probe(read_func, address, count)
+        if result > 0:
+            return address, result
+        # A silent block is treated as empty rather than waiting out a timeout for every split
+        if result == PROBE_TIMEOUT or count <= self.resolution:
+            return None
+        half = count // 2
+        return (self.find_first(read_func, address, half)
+                or self.find_first(read_func, address + half, count - half))
+
+    def find_start(self, read_func, start, floor):
+        """Extend a valid range backwards from start (not below floor), returning its exact first address"""
+        while start > floor:
+            limit = min(SWEEP_BLOCK_SIZE, start - floor)
+            if self.reads_fully(read_func, start - limit, limit):
+                start -= limit
+                continue
+            start -= self.longest_read(read_func, start, limit - 1, backwards=True)
+            break
+        return start
+
+    def find_end(self, read_func, end):
+        """Extend a valid range forwards from end, returning its exact last address"""
+        while end + 1 < ADDRESS_SPACE:
+            limit = min(SWEEP_BLOCK_SIZE, ADDRESS_SPACE - end - 1)
+            result = self.probe(read_func, end + 1, limit)
+            if result <= 0:
+                # Some firmware rejects any read that runs past the range
+                result = self.longest_read(read_func, end + 1, limit - 1)
+            if result == 0:
+                break
+            end += result
+        return end
+
+    def sweep(self, read_func, table):
+        """Sweep the full address space for one register table, recording ranges in self.ranges[table]"""
+        found = self.ranges[table] = []
+        address = 0
+        try:
+            while address < ADDRESS_SPACE:
+                self.swept_to[table] = address
+                count = min(SWEEP_BLOCK_SIZE, ADDRESS_SPACE - address)
+                hit = self.find_first(read_func, address, count)
+                if hit is None:
+                    address += count
+                else:
+                    hit_address, answered = hit
+                    floor = found[-1][1] + 1 if found else 0
+                    start = self.find_start(read_func, hit_address, floor)
+                    end = self.find_end(read_func, hit_address + answered - 1)
+                    found.append((start, end))
+                    address = end + 1
+                print(f"\r  {table.capitalize()}: {address:5d}/{ADDRESS_SPACE} addresses, "
+                      f"{self.requests} requests", end="", flush=True)
+        except FunctionUnsupported:
+            self.ranges[table] = None
+            address = ADDRESS_SPACE
+        finally:
+            self.swept_to[table] = address
+        print()
+
+
+def format_ranges(ranges):
+    """Format ranges as 'start-end' strings (one per line in the saved map)"""
+    if ranges is None:
+        return None
+    return [f"{start}-{end}" for start, end in ranges]
@@ -1,9 +1,12 @@
 import sys
+import json
 import time
 import argparse
 from datetime import datetime
 from pymodbus.client import ModbusTcpClient
-from ps20_common import UNIT_IPS, REGISTER_MAP
+from ps20_common import UNIT_IPS, UNIT_SERIALS, REGISTER_MAP
+from ps20_sweep import (RegisterSweeper, SweepAborted, format_ranges,
+                        SWEEP_RATE, SWEEP_RESOLUTION, ADDRESS_SPACE, SWEEP_BLOCK_SIZE)
 
 # Parse command-line arguments
 parser = argparse.ArgumentParser(
@@ -21,6 +24,15 @@ parser.add_argument('-x', '--experiment', action='store_true',
                     help='Experimental mode - read register 4660 (0x1234) for unit identity')
 parser.add_argument('-a', '--all', action='store_true',
                     help='Show all registers including decoded ones in raw output')
+parser.add_argument('-s', '--sweep', action='store_true',
+                    help='Sweep mode - map implemented holding/input register ranges across addresses 0-65535')
+parser.add_argument('-o', '--output', type=str, default=None,
+                    help='Sweep mode output file (default: ps20_regmap_unit<N>_<date>.json)')
+parser.add_argument('-r', '--rate', type=float, default=SWEEP_RATE,
+                    help=f'Sweep mode maximum requests per second (default: {SWEEP_RATE:g})')
+parser.add_argument('--resolution', type=int, default=SWEEP_RESOLUTION,
+                    help=f'Sweep mode smallest empty block to bisect further (default: {SWEEP_RESOLUTION}, '
+                         f'1 = exact map)')
 
 args = parser.parse_args()
 unit = args.unit
@@ -29,8 +41,81 @@ watch_mode = args.watch
 table_mode = args.table
 experiment_mode = args.experiment
 show_all = args.all
+sweep_mode = args.sweep
 
-if experiment_mode:
+if args.rate <= 0:
+    parser.error("--rate must be positive")
+if args.resolution < 1:
+    parser.error("--resolution must be at least 1")
+
+if sweep_mode:
+    # Sweep mode - map which register ranges the unit implements
+    print(f"--- Sweep Mode: Mapping register space 0-{ADDRESS_SPACE - 1} ---\n")
+    print(f"Rate limit: {args.rate:g} requests/second, resolution: {args.resolution} registers")
+    print(f"Connecting to Unit {unit} ({ip})...", end=" ", flush=True)
+
+    client = ModbusTcpClient(ip, port=502, retries=0, timeout=1)
+    if not client.connect():
+        print("FAILED")
+        sys.exit(1)
+
+    print("OK\n")
+
+    sweeper = RegisterSweeper(client, args.rate, args.resolution)
+    sweep_start = datetime.now()
+    stopped = None
+    try:
+        sweeper.sweep(client.read_holding_registers, "holding")
+        sweeper.sweep(client.read_input_registers, "input")
+    except SweepAborted as e:
+        stopped = f"Sweep aborted - {e}"
+    except KeyboardInterrupt:
+        stopped = "Sweep stopped by user"
+    client.close()
+
+    # Addresses are raw Modbus protocol addresses (the other modes read from address 1)
+    register_map = {
+        "unit": unit,
+        "ip": ip,
+        "serial": UNIT_SERIALS[unit],
+        "swept_at": sweep_start.isoformat(timespec='seconds'),
+        "block_size": SWEEP_BLOCK_SIZE,
+        "resolution": args.resolution,
+        "holding": format_ranges(sweeper.ranges.get("holding", [])),
+        "input": format_ranges(sweeper.ranges.get("input", []))
+    }
+    if stopped:
+        # Keep what was found so far, recording where each table stopped
+        register_map["complete"] = False
+        register_map["swept_to"] = {table: sweeper.swept_to.get(table, 0) for table in ("holding", "input")}
+
+    output_file = args.output or f"ps20_regmap_unit{unit}_{sweep_start.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, 'w') as f:
+        json.dump(register_map, f, indent=2)
+        f.write("\n")
+
+    if stopped:
+        print(f"\n\n{stopped}.")
+
+    print("\n--- Implemented Register Ranges ---")
+    for table in ("holding", "input"):
+        ranges = sweeper.ranges.get(table, [])
+        if ranges is None:
+            print(f"{table.capitalize()}: not supported")
+        elif not ranges:
+            print(f"{table.capitalize()}: none")
+        else:
+            print(f"{table.capitalize()}: {', '.join(format_ranges(ranges))}")
+
+    print(f"\n{sweeper.requests} requests ({sweeper.timeouts} timeouts) "
+          f"in {(datetime.now() - sweep_start).total_seconds():.0f} seconds")
+    if stopped:
+        print(f"Partial register map saved to {output_file}")
+        sys.exit(1)
+    print(f"Register map saved to {output_file}")
+    print("\n--- Sweep Complete ---")
+
+elif experiment_mode:
     # Experimental mode - read register 4660 (0x1234)
     print(f"--- Experimental Mode: Reading register 4660 (0x1234) ---\n")
     print(f"Connecting to Unit {unit} ({ip})...", end=" ", flush=True)
@@ -0,0 +1,102 @@
+"""
+Checks for the register-space sweeper against simulated PS20 units
+"""
+import pytest
+from pymodbus.exceptions import ModbusIOException
+from pymodbus.pdu import ExceptionResponse
+from ps20_sweep import RegisterSweeper, ADDRESS_SPACE, SWEEP_BLOCK_SIZE
+
+PS20_LAYOUT = set(range(1, 43))
+
+
+class Response:
+    def __init__(self, registers):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+class FakeUnit:
+    """Simulated unit: 'short' answers with the valid prefix like the PS20, 'reject' refuses
+    any read touching an invalid register, 'silent' never answers invalid reads"""
+
+    connected = True
+
+    def __init__(self, valid, mode="short"):
+        self.valid = valid
+        self.mode = mode
+
+    def connect(self):
+        return True
+
+    def read(self, address, count, device_id):
+        assert 1 <= count <= SWEEP_BLOCK_SIZE and address + count <= ADDRESS_SPACE
+        answered = 0
+        while answered < count and address + answered in self.valid:
+            answered += 1
+        if answered == count or (answered and self.mode == "short"):
+            return Response([0] * answered)
+        if self.mode == "silent":
+            raise ModbusIOException("no response")
+        return ExceptionResponse(3, 2)
+
+
+def sweep(unit, resolution=16):
+    sweeper = RegisterSweeper(unit, rate=1e9, resolution=resolution)
+    sweeper.sweep(unit.read, "holding")
+    return sweeper
+
+
+@pytest.mark.parametrize("mode", ["short", "reject"])
+def test_ps20_layout_is_exact(mode):
+    assert sweep(FakeUnit(PS20_LAYOUT, mode)).ranges["holding"] == [(1, 42)]
+
+
+@pytest.mark.parametrize("mode", ["short", "reject"])
+def test_isolated_register_found_at_resolution_1(mode):
+    sweeper = sweep(FakeUnit(PS20_LAYOUT | {4660}, mode), resolution=1)
+    assert sweeper.ranges["holding"] == [(1, 42), (4660, 4660)]
+
+
+@pytest.mark.parametrize("mode", ["short", "reject"])
+def test_unaligned_range_is_exact(mode):
+    unit = FakeUnit(PS20_LAYOUT | set(range(1000, 1100)), mode)
+    assert sweep(unit).ranges["holding"] == [(1, 42), (1000, 1099)]
+
+
+def test_silent_unit_finds_ranges_covering_a_block():
+    # Timed-out blocks are not split, so only ranges spanning a whole block are found
+    unit = FakeUnit(PS20_LAYOUT | set(range(1000, 1250)), "silent")
+    assert sweep(unit).ranges["holding"] == [(1000, 1249)]
+
+
+def test_silent_blocks_are_not_split():
+    sweeper = sweep(FakeUnit(set(), "silent"))
+    assert sweeper.ranges["holding"] == []
+    assert sweeper.requests == -(-ADDRESS_SPACE // SWEEP_BLOCK_SIZE)
+
+
+def test_unsupported_function():
+    class NoInputRegisters(FakeUnit):
+        def read(self, address, count, device_id):
+            return ExceptionResponse(4, 1)
+
+    sweeper = sweep(NoInputRegisters(set()))
+    assert sweeper.ranges["holding"] is None
+    assert sweeper.swept_to["holding"] == ADDRESS_SPACE
+
+
+def test_interrupted_sweep_keeps_partial_map():
+    class Interrupted(FakeUnit):
+        def read(self, address, count, device_id):
+            if address >= 5000:
+                raise KeyboardInterrupt
+            return super().read(address, count, device_id)
+
+    sweeper = RegisterSweeper(Interrupted(PS20_LAYOUT), rate=1e9)
+    with pytest.raises(KeyboardInterrupt):
+        sweeper.sweep(sweeper.client.read, "holding")
+    assert sweeper.ranges["holding"] == [(1, 42)]
+    # Blocks restart after the range end, so the interrupted block starts at 43 + 39 * 125
+    assert sweeper.swept_to["holding"] == 4918